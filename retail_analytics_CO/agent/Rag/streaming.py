@@ -0,0 +1,119 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Iterator
+
+HEADING_SPLIT = re.compile(r'#+ ')
+
+
+def check_window(max_chars: int, overlap: int):
+    """Each window has to advance, so the overlap must be smaller than the window"""
+    if max_chars <= 0 or not 0 <= overlap < max_chars:
+        raise ValueError(f"need 0 <= overlap < max_chars, got max_chars={max_chars}, overlap={overlap}")
+
+
+def stream_chunks(path: str, max_chars: int = 2000, overlap: int = 200) -> Iterator[Tuple[int, int, str]]:
+    """Stream a file line by line into (paragraph, part, text) chunks.
+
+    Paragraphs are numbered exactly as re.split(r'\\n\\s*\\n|#+ ', content) would number
+    them; paragraphs longer than max_chars are cut into overlapping parts.
+    """
+    check_window(max_chars, overlap)
+    paragraph = 0
+    part = 0
+    buffer = ""
+    in_blank_run = False
+    previous_line = False
+
+    def flush(final: bool):
+        nonlocal buffer, part
+        # Emit full windows while the buffer is over the limit, keeping `overlap` chars
+        while len(buffer) > max_chars:
+            window, buffer = buffer[:max_chars], buffer[max_chars - overlap:]
+            if window.strip():
+                yield paragraph, part, window.strip()
+            part += 1
+        if final:
+            if buffer.strip():
+                yield paragraph, part, buffer.strip()
+            buffer = ""
+            part = 0
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            text = line[:-1] if line.endswith('\n') else line
+
+            if not text.strip() and line.endswith('\n') and previous_line:
+                # A whitespace-only line after any line is a paragraph break; runs count once
+                if not in_blank_run:
+                    yield from flush(final=True)
+                    paragraph += 1
+                    in_blank_run = True
+                previous_line = True
+                continue
+
+            if in_blank_run:
+                in_blank_run = False
+            elif previous_line:
+                buffer += '\n'
+            previous_line = True
+
+            pieces = HEADING_SPLIT.split(text)
+            buffer += pieces[0]
+            for piece in pieces[1:]:
+                yield from flush(final=True)
+                paragraph += 1
+                buffer = piece
+            yield from flush(final=False)
+
+    yield from flush(final=True)
+
+
+def chunk_file(args: Tuple[str, int, int]) -> Tuple[int, List[Tuple[int, int, str]]]:
+    """Worker task: chunk one file and report its size"""
+    path, max_chars, overlap = args
+    try:
+        return os.path.getsize(path), list(stream_chunks(path, max_chars, overlap))
+    except Exception as e:
+        print(f"Error loading {os.path.basename(path)}: {e}")
+        return 0, []
+
+
+def ingest_documents(retriever, docs_folder: str, workers: int = 1,
+                     max_chars: int = 2000, overlap: int = 200) -> int:
+    """Chunk every document in a folder (optionally across processes) into the retriever index"""
+    check_window(max_chars, overlap)
+    file_names = [f for f in os.listdir(docs_folder) if f.endswith('.md') or f.endswith('.txt')]
+    tasks = [(os.path.join(docs_folder, name), max_chars, overlap) for name in file_names]
+
+    start = time.time()
+    total_bytes = 0
+    total_chunks = 0
+
+    def add(file_name: str, size: int, chunks: List[Tuple[int, int, str]]):
+        nonlocal total_bytes, total_chunks
+        source_index = len(retriever.sources)
+        retriever.sources.append(file_name.replace('.txt', ''))
+        for paragraph, part, text in chunks:
+            retriever.chunks.append(text)
+            retriever.chunk_source.append(source_index)
+            retriever.chunk_number.append(paragraph)
+            retriever.chunk_part.append(part)
+        total_bytes += size
+        total_chunks += len(chunks)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() keeps file order, so chunk indexes don't depend on worker timing
+            results = pool.map(chunk_file, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+            for file_name, (size, chunks) in zip(file_names, results):
+                add(file_name, size, chunks)
+    else:
+        for file_name, task in zip(file_names, tasks):
+            add(file_name, *chunk_file(task))
+
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"   → Ingested {total_bytes / 1e6:.2f} MB in {elapsed:.2f}s "
+          f"({total_bytes / 1e6 / elapsed:.1f} MB/s, {total_chunks / elapsed:.0f} chunks/s)")
+    return len(file_names)
@@ -0,0 +1,87 @@
+import sqlite3
+
+# Simplified views used by the generated SQL
+VIEWS_SQL = [
+    "CREATE VIEW IF NOT EXISTS orders AS SELECT * FROM Orders;",
+    "CREATE VIEW IF NOT EXISTS order_items AS SELECT * FROM \"Order Details\";",
+    "CREATE VIEW IF NOT EXISTS products AS SELECT * FROM Products;",
+    "CREATE VIEW IF NOT EXISTS customers AS SELECT * FROM Customers;",
+    "CREATE VIEW IF NOT EXISTS categories AS SELECT * FROM Categories;",
+    "CREATE VIEW IF NOT EXISTS suppliers AS SELECT * FROM Suppliers;"
+]
+
+# Indexes behind the date-window and category joins in the KPI queries
+INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_orders_orderdate ON Orders(OrderDate);",
+    "CREATE INDEX IF NOT EXISTS idx_orders_customer ON Orders(CustomerID);",
+    "CREATE INDEX IF NOT EXISTS idx_order_details_product ON \"Order Details\"(ProductID);",
+    "CREATE INDEX IF NOT EXISTS idx_products_category ON Products(CategoryID);"
+]
+
+
+def apply_analytic_schema(conn: sqlite3.Connection, verbose: bool = False):
+    """Create the analytic views and indexes on an open connection"""
+    for sql in VIEWS_SQL + INDEXES_SQL:
+        try:
+            conn.execute(sql)
+            if verbose:
+                print(f"✅ {sql.split(' ')[5]} - created")
+        except Exception as e:
+            print(f"❌ Error in {sql}: {e}")
+    conn.commit()
+
+
+# Pre-aggregated revenue/quantity per month, kept current by ingest_orders.py
+AGGREGATES_SQL = [
+    """CREATE TABLE IF NOT EXISTS agg_category_month (
+        CategoryID INTEGER, Month TEXT, Revenue REAL, Quantity INTEGER,
+        PRIMARY KEY (CategoryID, Month));""",
+    """CREATE TABLE IF NOT EXISTS agg_product_month (
+        ProductID INTEGER, Month TEXT, Revenue REAL, Quantity INTEGER,
+        PRIMARY KEY (ProductID, Month));""",
+    # One row per (batch, month touched); result caches use it to invalidate
+    """CREATE TABLE IF NOT EXISTS ingest_log (
+        BatchID INTEGER, Month TEXT, IngestedAt TEXT);""",
+    "CREATE INDEX IF NOT EXISTS idx_ingest_log_batch ON ingest_log(BatchID);"
+]
+
+# Delta upserts from a staging table of new order lines (temp._new_details)
+AGGREGATE_DELTAS_SQL = [
+    """INSERT INTO agg_category_month (CategoryID, Month, Revenue, Quantity)
+       SELECT p.CategoryID, strftime('%Y-%m', o.OrderDate),
+              SUM(d.UnitPrice * d.Quantity * (1 - d.Discount)), SUM(d.Quantity)
+       FROM temp._new_details d
+       JOIN Orders o ON d.OrderID = o.OrderID
+       JOIN Products p ON d.ProductID = p.ProductID
+       WHERE true
+       GROUP BY p.CategoryID, strftime('%Y-%m', o.OrderDate)
+       ON CONFLICT (CategoryID, Month) DO UPDATE SET
+           Revenue = Revenue + excluded.Revenue,
+           Quantity = Quantity + excluded.Quantity;""",
+    """INSERT INTO agg_product_month (ProductID, Month, Revenue, Quantity)
+       SELECT d.ProductID, strftime('%Y-%m', o.OrderDate),
+              SUM(d.UnitPrice * d.Quantity * (1 - d.Discount)), SUM(d.Quantity)
+       FROM temp._new_details d
+       JOIN Orders o ON d.OrderID = o.OrderID
+       WHERE true
+       GROUP BY d.ProductID, strftime('%Y-%m', o.OrderDate)
+       ON CONFLICT (ProductID, Month) DO UPDATE SET
+           Revenue = Revenue + excluded.Revenue,
+           Quantity = Quantity + excluded.Quantity;"""
+]
+
+
+def build_aggregates(conn: sqlite3.Connection):
+    """Rebuild the monthly aggregate tables from the full order history"""
+    for sql in AGGREGATES_SQL:
+        conn.execute(sql)
+    conn.execute("DELETE FROM agg_category_month")
+    conn.execute("DELETE FROM agg_product_month")
+
+    # Treat the whole history as one big delta
+    conn.execute("DROP TABLE IF EXISTS temp._new_details")
+    conn.execute("CREATE TEMP TABLE _new_details AS SELECT * FROM \"Order Details\"")
+    for sql in AGGREGATE_DELTAS_SQL:
+        conn.execute(sql)
+    conn.execute("DROP TABLE temp._new_details")
+    conn.commit()
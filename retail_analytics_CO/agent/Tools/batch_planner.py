@@ -0,0 +1,229 @@
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+# Generated queries have the shape SELECT ... FROM <joins> [WHERE ...] [GROUP BY/ORDER BY/LIMIT ...]
+QUERY_SHAPE = re.compile(
+    r"^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<relation>.+?)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?P<tail>\s+(?:GROUP\s+BY|ORDER\s+BY|LIMIT)\s+.*?)?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+TABLE_ALIAS = re.compile(r'(?:FROM|JOIN)\s+("[^"]+"|\w+)\s+(?:AS\s+)?(\w+)', re.IGNORECASE)
+KEYWORDS = {"join", "inner", "left", "cross", "on", "where", "group", "order", "limit"}
+# `*` / `alias.*` in the select list would only see the columns copied into the shared scan
+STAR_COLUMN = re.compile(r"(?:^(?:DISTINCT\s+)?|,)\s*(?:\w+\.)?\*\s*(?=,|$)", re.IGNORECASE)
+QUOTED = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"")
+# A select item's own name: `expr AS name` or `expr name`
+ITEM_ALIAS = re.compile(r"(?:\s+AS\s+|(?<=[\w)\"'])\s+)(\w+|\"[^\"]*\")$", re.IGNORECASE)
+SET_QUANTIFIER = re.compile(r"^(DISTINCT|ALL)\s+", re.IGNORECASE)
+
+
+@dataclass
+class ParsedQuery:
+    index: int
+    query: str
+    select: str
+    relation: str
+    where: Optional[str]
+    tail: str
+    aliases: List[str]
+
+
+@dataclass
+class QueryGroup:
+    """Queries sharing one base relation, answered from a single scan"""
+    relation: str
+    members: List[ParsedQuery] = field(default_factory=list)
+    setup: List[str] = field(default_factory=list)
+    rewritten: List[str] = field(default_factory=list)
+
+
+def parse_query(index: int, query: str) -> Optional[ParsedQuery]:
+    """Split a generated query into its parts, or None if it can't be shared"""
+    if query.upper().count("SELECT") != 1:
+        return None
+    match = QUERY_SHAPE.match(query)
+    if not match:
+        return None
+
+    relation = " ".join(match.group("relation").split())
+    aliases = [alias for _, alias in TABLE_ALIAS.findall("FROM " + relation)
+               if alias.lower() not in KEYWORDS]
+    # Every table needs an alias so column references can be rewritten
+    if len(aliases) != len(re.findall(r"\b(?:FROM|JOIN)\b", "FROM " + relation, re.IGNORECASE)):
+        return None
+
+    select = match.group("select")
+    if STAR_COLUMN.search(select.strip()):
+        return None
+    # Column references are rewritten textually, so they must not appear inside literals
+    column_ref = re.compile(r"\b(?:" + "|".join(map(re.escape, aliases)) + r")\.\w")
+    if any(column_ref.search(text) for text in QUOTED.findall(query)):
+        return None
+
+    return ParsedQuery(
+        index=index,
+        query=query,
+        select=select,
+        relation=relation,
+        where=match.group("where"),
+        tail=match.group("tail") or "",
+        aliases=aliases,
+    )
+
+
+def _single(index: int, query: str) -> QueryGroup:
+    """A group that runs one query as written"""
+    return QueryGroup(relation="", members=[ParsedQuery(index, query, "", "", None, "", [])])
+
+
+def split_top_level(text: str, sep: str = ",") -> List[str]:
+    """Split on separators that are not inside parentheses or quotes"""
+    parts, depth, quote, current = [], 0, None, ""
+    for ch in text:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        current += ch
+    parts.append(current.strip())
+    return parts
+
+
+def plan_batch(queries: List[str], share_scans: bool = True) -> List[QueryGroup]:
+    """Group queries by base relation; each group is executed as one scan"""
+    if not share_scans:
+        return [_single(i, query) for i, query in enumerate(queries)]
+
+    groups: Dict[str, QueryGroup] = {}
+    singles = []
+
+    for i, query in enumerate(queries):
+        parsed = parse_query(i, query)
+        if parsed is None:
+            singles.append(_single(i, query))
+            continue
+        key = parsed.relation.lower()
+        groups.setdefault(key, QueryGroup(relation=parsed.relation)).members.append(parsed)
+
+    plan = []
+    for n, group in enumerate(groups.values()):
+        if len(group.members) > 1:
+            _build_shared_scan(group, f"_batch_scan_{n}")
+        plan.append(group)
+
+    return plan + singles
+
+
+def _build_shared_scan(group: QueryGroup, table: str):
+    """Materialise the joined rows once and point every member query at them"""
+    aliases = group.members[0].aliases
+    column_ref = re.compile(r"\b(" + "|".join(map(re.escape, aliases)) + r")\.(\w+)\b")
+
+    columns = []
+    for member in group.members:
+        for part in (member.select, member.where or "", member.tail):
+            for alias, column in column_ref.findall(part):
+                if (alias, column) not in columns:
+                    columns.append((alias, column))
+    if not columns:
+        return
+
+    select_list = ", ".join(f"{alias}.{column} AS {alias}__{column}" for alias, column in columns)
+    setup = f"CREATE TEMP TABLE {table} AS SELECT {select_list} FROM {group.relation}"
+    # Prefilter to the union of windows, unless some query needs every row
+    if all(member.where for member in group.members):
+        setup += " WHERE " + " OR ".join(f"({member.where})" for member in group.members)
+    group.setup = [f"DROP TABLE IF EXISTS temp.{table}", setup]
+
+    def rewrite(text: str) -> str:
+        return column_ref.sub(r"\1__\2", text)
+
+    def rewrite_select(select: str) -> str:
+        # Every item keeps the output name it has when the query runs on its own
+        quantifier = SET_QUANTIFIER.match(select)
+        prefix = quantifier.group(0) if quantifier else ""
+        items = []
+        for item in split_top_level(select[len(prefix):]):
+            alias = ITEM_ALIAS.search(item)
+            bare = re.fullmatch(r"\w+\.(\w+)", item)
+            if alias and alias.group(1).upper() not in ("END", "DESC", "ASC"):
+                items.append(rewrite(item))
+            elif bare:
+                items.append(f"{rewrite(item)} AS {bare.group(1)}")
+            else:
+                # SQLite names an unaliased expression after its text
+                name = item.replace('"', '""')
+                items.append(f'{rewrite(item)} AS "{name}"')
+        return prefix + ", ".join(items)
+
+    for member in group.members:
+        query = f"SELECT {rewrite_select(member.select)} FROM {table}"
+        if member.where:
+            query += f" WHERE {rewrite(member.where)}"
+        group.rewritten.append(query + rewrite(member.tail))
+
+
+def fetch_result(conn: sqlite3.Connection, query: str) -> Dict[str, Any]:
+    """Execute one query and return it in the SQLiteTool result format"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [description[0] for description in cursor.description]
+        return {
+            "success": True,
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "error": None
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "columns": [],
+            "rows": [],
+            "row_count": 0,
+            "error": str(e)
+        }
+
+
+def execute_group(conn: sqlite3.Connection, group: QueryGroup) -> List[Any]:
+    """Run a planned group on a connection, returning (index, result) pairs"""
+    if group.rewritten:
+        try:
+            for statement in group.setup:
+                conn.execute(statement)
+        except Exception as e:
+            print(f"   → Shared scan failed, running queries separately: {e}")
+            group.rewritten = []
+
+    results = []
+    for i, member in enumerate(group.members):
+        result = None
+        if group.rewritten:
+            result = fetch_result(conn, group.rewritten[i])
+        # Anything the rewrite couldn't express falls back to the original query
+        if result is None or not result["success"]:
+            result = fetch_result(conn, member.query)
+        results.append((member.index, result))
+    return results
+
+
+def execute_plan(conn: sqlite3.Connection, plan: List[QueryGroup], total: int) -> List[Dict[str, Any]]:
+    """Run every group in a plan and return results in the original query order"""
+    results: List[Dict[str, Any]] = [None] * total
+    for group in plan:
+        for index, result in execute_group(conn, group):
+            results[index] = result
+    return results
@@ -0,0 +1,91 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Iterable
+
+DATE_LITERAL = re.compile(r"'(\d{4})-(\d{2})(?:-\d{2})?[^']*'")
+BETWEEN_DATES = re.compile(r"BETWEEN\s+'(\d{4})-(\d{2})[^']*'\s+AND\s+'(\d{4})-(\d{2})[^']*'", re.IGNORECASE)
+YEAR_EQUALS = re.compile(r"strftime\s*\(\s*'%Y'\s*,\s*[\w.]+\s*\)\s*=\s*'(\d{4})'", re.IGNORECASE)
+
+
+def _month_range(start_year: int, start_month: int, end_year: int, end_month: int) -> Set[str]:
+    months = set()
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        months.add(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def query_months(query: str) -> Optional[Set[str]]:
+    """Months ('YYYY-MM') a query's result depends on, or None if it may depend on any month"""
+    months: Set[str] = set()
+    for y1, m1, y2, m2 in BETWEEN_DATES.findall(query):
+        months |= _month_range(int(y1), int(m1), int(y2), int(m2))
+    for year in YEAR_EQUALS.findall(query):
+        months |= _month_range(int(year), 1, int(year), 12)
+
+    # Any other date literal (open-ended >=, <, ...) means we can't bound the window
+    rest = YEAR_EQUALS.sub("", BETWEEN_DATES.sub("", query))
+    if not months or DATE_LITERAL.search(rest):
+        return None
+    return months
+
+
+class ResultCache:
+    """LRU cache of query results, invalidated per month as new orders are ingested"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_batch = None
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None:
+                return None
+            self._entries.move_to_end(query)
+            return entry[1]
+
+    def put(self, query: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[query] = (query_months(query), result)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, months: Iterable[str]) -> int:
+        """Drop entries that depend on any of the given months"""
+        months = set(months)
+        with self._lock:
+            stale = [query for query, (depends_on, _) in self._entries.items()
+                     if depends_on is None or depends_on & months]
+            for query in stale:
+                del self._entries[query]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def sync(self, conn: sqlite3.Connection):
+        """Apply invalidations for batches recorded in ingest_log since the last sync"""
+        try:
+            if self._last_batch is None:
+                row = conn.execute("SELECT MAX(BatchID) FROM ingest_log").fetchone()
+                self._last_batch = row[0] or 0
+                return
+            rows = conn.execute(
+                "SELECT BatchID, Month FROM ingest_log WHERE BatchID > ?", (self._last_batch,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No ingest_log yet: nothing has been ingested incrementally
+            return
+
+        if rows:
+            dropped = self.invalidate(month for _, month in rows)
+            self._last_batch = max(batch for batch, _ in rows)
+            print(f"   → Cache: {dropped} entries invalidated by ingested orders")
@@ -0,0 +1,127 @@
+import math
+import sqlite3
+from typing import Dict, Any, Optional
+
+# Per-line measure for each supported KPI
+KPI_MEASURES = {
+    "revenue": "s.UnitPrice * s.Quantity * (1 - s.Discount)",
+    "quantity": "s.Quantity",
+    "order_lines": "1",
+    "aov": "s.UnitPrice * s.Quantity * (1 - s.Discount)",
+}
+
+SAMPLE_TABLES_SQL = [
+    "DROP TABLE IF EXISTS sample_order_items;",
+    "DROP TABLE IF EXISTS sample_strata;",
+    """CREATE TABLE sample_strata (
+        CategoryID INTEGER, Month TEXT, Population INTEGER, SampleSize INTEGER,
+        PRIMARY KEY (CategoryID, Month));""",
+    """CREATE TABLE sample_order_items (
+        OrderID INTEGER, ProductID INTEGER, UnitPrice REAL, Quantity INTEGER, Discount REAL,
+        CategoryID INTEGER, Month TEXT, OrderDate TEXT);""",
+]
+
+
+def build_samples(conn: sqlite3.Connection, fraction: float = 0.01, min_per_stratum: int = 30):
+    """Build a stratified sample of order lines, stratified by category and month"""
+    for sql in SAMPLE_TABLES_SQL:
+        conn.execute(sql)
+
+    # Deterministic pseudo-random order within each stratum, so rebuilds are reproducible
+    conn.execute(
+        """INSERT INTO sample_order_items
+           SELECT OrderID, ProductID, UnitPrice, Quantity, Discount, CategoryID, Month, OrderDate
+           FROM (
+               SELECT od.OrderID, od.ProductID, od.UnitPrice, od.Quantity, od.Discount,
+                      p.CategoryID, strftime('%Y-%m', o.OrderDate) AS Month, o.OrderDate,
+                      ROW_NUMBER() OVER (
+                          PARTITION BY p.CategoryID, strftime('%Y-%m', o.OrderDate)
+                          ORDER BY (od.OrderID * 2654435761 + od.ProductID * 40503) % 4294967291
+                      ) AS rn,
+                      COUNT(*) OVER (PARTITION BY p.CategoryID, strftime('%Y-%m', o.OrderDate)) AS population
+               FROM "Order Details" od
+               JOIN Orders o ON od.OrderID = o.OrderID
+               JOIN Products p ON od.ProductID = p.ProductID
+           )
+           WHERE rn <= MAX(?, CAST(population * ? + 0.999999 AS INTEGER))""",
+        (min_per_stratum, fraction)
+    )
+    conn.execute(
+        """INSERT INTO sample_strata (CategoryID, Month, Population, SampleSize)
+           SELECT population.CategoryID, population.Month, population.Lines, sampled.Lines
+           FROM (
+               SELECT p.CategoryID, strftime('%Y-%m', o.OrderDate) AS Month, COUNT(*) AS Lines
+               FROM "Order Details" od
+               JOIN Orders o ON od.OrderID = o.OrderID
+               JOIN Products p ON od.ProductID = p.ProductID
+               GROUP BY p.CategoryID, strftime('%Y-%m', o.OrderDate)
+           ) population
+           JOIN (
+               SELECT CategoryID, Month, COUNT(*) AS Lines
+               FROM sample_order_items
+               GROUP BY CategoryID, Month
+           ) sampled ON sampled.CategoryID = population.CategoryID AND sampled.Month = population.Month"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sample_stratum ON sample_order_items(Month, CategoryID)")
+    conn.commit()
+
+    sampled, population = conn.execute("SELECT SUM(SampleSize), SUM(Population) FROM sample_strata").fetchone()
+    return sampled or 0, population or 0
+
+
+def estimate_kpi(conn: sqlite3.Connection, kpi: str, start: str, end: str,
+                 category: Optional[str] = None, z: float = 1.96) -> Dict[str, Any]:
+    """Stratified estimate of a SUM/COUNT/AOV KPI with a confidence interval.
+
+    The window is `OrderDate BETWEEN start AND end`, the same predicate the generated SQL uses.
+    """
+    measure = KPI_MEASURES[kpi]
+    params = [start, end, start, end, start[:7], end[:7]]
+    category_filter = ""
+    if category:
+        category_filter = "AND s.CategoryID IN (SELECT CategoryID FROM Categories WHERE CategoryName = ?)"
+        params.append(category)
+
+    # Lines outside the window count as zero, which gives the domain estimator per stratum
+    strata = conn.execute(
+        f"""SELECT st.Population, st.SampleSize,
+                   SUM(CASE WHEN s.OrderDate BETWEEN ? AND ? THEN {measure} ELSE 0 END),
+                   SUM(CASE WHEN s.OrderDate BETWEEN ? AND ? THEN ({measure}) * ({measure}) ELSE 0 END)
+            FROM sample_order_items s
+            JOIN sample_strata st ON st.CategoryID = s.CategoryID AND st.Month = s.Month
+            WHERE s.Month BETWEEN ? AND ? {category_filter}
+            GROUP BY s.CategoryID, s.Month""",
+        params
+    ).fetchall()
+
+    total = 0.0
+    variance = 0.0
+    sample_rows = 0
+    for population, size, y_sum, y_sumsq in strata:
+        total += population / size * y_sum
+        sample_rows += size
+        if size > 1 and size < population:
+            s2 = (y_sumsq - y_sum * y_sum / size) / (size - 1)
+            variance += population * population * (1 - size / population) * s2 / size
+
+    margin = z * math.sqrt(max(variance, 0.0))
+    estimate = total
+
+    if kpi == "aov":
+        # Order count is exact and cheap through the OrderDate index
+        orders = conn.execute(
+            "SELECT COUNT(*) FROM Orders WHERE OrderDate BETWEEN ? AND ?", (start, end)
+        ).fetchone()[0]
+        estimate = total / orders if orders else 0.0
+        margin = margin / orders if orders else 0.0
+
+    return {
+        "kpi": kpi,
+        "estimate": estimate,
+        "ci_low": estimate - margin,
+        "ci_high": estimate + margin,
+        "margin": margin,
+        "relative_error": margin / abs(estimate) if estimate else 0.0,
+        "sample_rows": sample_rows,
+        "strata": len(strata),
+    }
@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from Tools.batch_planner import parse_query, fetch_result, split_top_level
+from Tools.result_cache import query_months, BETWEEN_DATES, YEAR_EQUALS
+
+MANIFEST = "shards.json"
+PARTITION_FORMATS = {"year": "%Y", "month": "%Y-%m"}
+# SQLite attaches at most 10 databases per connection by default
+MAX_ATTACHED = 10
+
+TAIL_SHAPE = re.compile(
+    r"^\s*(?:GROUP\s+BY\s+(?P<group>.+?))?\s*(?:ORDER\s+BY\s+(?P<order>.+?))?\s*"
+    r"(?:LIMIT\s+(?P<limit>\d+))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Tail clauses split_aggregate can't carry over to the merge query
+UNSUPPORTED_TAIL = re.compile(r"\b(HAVING|WINDOW|OFFSET|UNION|INTERSECT|EXCEPT|COLLATE|NULLS)\b", re.IGNORECASE)
+AGGREGATE = re.compile(r"^(SUM|COUNT|MIN|MAX)\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+ROUNDED = re.compile(r"^ROUND\s*\((.*),\s*(\d+)\s*\)$", re.IGNORECASE | re.DOTALL)
+SELECT_ITEM = re.compile(r"^(?P<expr>.+?)(?:\s+(?:AS\s+)?(?P<alias>\w+))?$", re.IGNORECASE | re.DOTALL)
+# Partial aggregates are combined with these functions when merging partitions
+MERGE_FUNCTIONS = {"SUM": "SUM", "COUNT": "SUM", "MIN": "MIN", "MAX": "MAX"}
+
+
+def last_ingest_batch(conn: sqlite3.Connection) -> int:
+    """Highest BatchID in ingest_log (see ingest_orders.py), 0 if nothing was ingested"""
+    try:
+        return conn.execute("SELECT COALESCE(MAX(BatchID), 0) FROM ingest_log").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+def build_shards(db_path: str, shard_dir: str, granularity: str = "year") -> Dict[str, str]:
+    """Copy Orders / Order Details into one SQLite file per year or month"""
+    date_format = PARTITION_FORMATS[granularity]
+    os.makedirs(shard_dir, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    ingest_batch = last_ingest_batch(conn)
+    table_sql = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name IN ('Orders', 'Order Details')"
+    ).fetchall())
+    keys = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT strftime('{date_format}', OrderDate) FROM Orders WHERE OrderDate IS NOT NULL ORDER BY 1"
+    )]
+
+    partitions = {}
+    for key in keys:
+        file_name = f"orders_{key}.db"
+        shard_path = os.path.join(shard_dir, file_name)
+        if os.path.exists(shard_path):
+            os.remove(shard_path)
+
+        conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+        for sql in table_sql.values():
+            conn.execute(re.sub(r"^CREATE TABLE\s+", "CREATE TABLE shard.", sql, flags=re.IGNORECASE))
+        conn.execute(
+            f"INSERT INTO shard.Orders SELECT * FROM main.Orders WHERE strftime('{date_format}', OrderDate) = ?",
+            (key,)
+        )
+        conn.execute(
+            f"""INSERT INTO shard."Order Details"
+                SELECT od.* FROM main."Order Details" od
+                JOIN main.Orders o ON od.OrderID = o.OrderID
+                WHERE strftime('{date_format}', o.OrderDate) = ?""",
+            (key,)
+        )
+        conn.execute("CREATE INDEX shard.idx_orders_orderdate ON Orders(OrderDate)")
+        conn.execute("CREATE INDEX shard.idx_order_details_product ON \"Order Details\"(ProductID)")
+        conn.commit()
+        conn.execute("DETACH DATABASE shard")
+        partitions[key] = file_name
+
+    conn.close()
+
+    with open(os.path.join(shard_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        # Later ingests are compared against this to find partitions that are behind
+        json.dump({"granularity": granularity, "partitions": partitions, "ingest_batch": ingest_batch}, f, indent=2)
+    return partitions
+
+
+def _balanced(text: str) -> bool:
+    depth = 0
+    for ch in text:
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def _normalize(expr: str) -> str:
+    return " ".join(expr.split()).lower()
+
+
+def split_aggregate(query: str) -> Optional[Dict[str, str]]:
+    """Rewrite a GROUP BY query into a per-partition query and a merge query.
+
+    Only SUM/COUNT/MIN/MAX (optionally wrapped in ROUND) over group keys are supported;
+    anything else returns None and is run over the partitions together instead.
+    """
+    parsed = parse_query(0, query)
+    if parsed is None or parsed.select.upper().startswith("DISTINCT"):
+        return None
+    if UNSUPPORTED_TAIL.search(parsed.tail):
+        return None
+    tail = TAIL_SHAPE.match(parsed.tail)
+    if not tail:
+        return None
+
+    group_exprs = split_top_level(tail.group("group")) if tail.group("group") else []
+    items = []
+    for text in split_top_level(parsed.select):
+        match = SELECT_ITEM.match(text)
+        expr, alias = match.group("expr").strip(), match.group("alias")
+        if alias is None and re.fullmatch(r"\w+\.\w+", expr):
+            alias = expr.split(".")[1]
+        if alias is None or alias.upper() in ("DESC", "ASC") or not _balanced(expr):
+            return None
+        items.append((expr, alias))
+
+    aliases = {alias.lower(): expr for expr, alias in items}
+    group_exprs = [aliases.get(expr.lower(), expr) for expr in group_exprs]
+    group_keys = [_normalize(expr) for expr in group_exprs]
+
+    partial_select = [f"{expr} AS g{i}" for i, expr in enumerate(group_exprs)]
+    merge_select = []
+    for expr, alias in items:
+        if _normalize(expr) in group_keys:
+            merge_select.append(f"g{group_keys.index(_normalize(expr))} AS {alias}")
+            continue
+
+        digits = None
+        rounded = ROUNDED.match(expr)
+        if rounded and _balanced(rounded.group(1)):
+            expr, digits = rounded.group(1).strip(), rounded.group(2)
+        aggregate = AGGREGATE.match(expr)
+        if (not aggregate or not _balanced(aggregate.group(2))
+                or aggregate.group(2).strip().upper().startswith("DISTINCT")):
+            return None
+
+        n = len(partial_select)
+        partial_select.append(f"{expr} AS a{n}")
+        merged = f"{MERGE_FUNCTIONS[aggregate.group(1).upper()]}(a{n})"
+        merge_select.append(f"ROUND({merged}, {digits}) AS {alias}" if digits else f"{merged} AS {alias}")
+
+    # ORDER BY has to refer to output columns so the merge query can apply it
+    order = tail.group("order")
+    if order:
+        for term in split_top_level(order):
+            name = re.sub(r"\s+(ASC|DESC)$", "", term.strip(), flags=re.IGNORECASE)
+            if name.lower() not in aliases:
+                return None
+
+    partial = f"SELECT {', '.join(partial_select)} FROM {parsed.relation}"
+    if parsed.where:
+        partial += f" WHERE {parsed.where}"
+    if group_exprs:
+        partial += f" GROUP BY {', '.join(group_exprs)}"
+
+    merge = f"SELECT {', '.join(merge_select)} FROM partials"
+    if group_exprs:
+        merge += f" GROUP BY {', '.join(f'g{i}' for i in range(len(group_exprs)))}"
+    if order:
+        merge += f" ORDER BY {order}"
+    if tail.group("limit"):
+        merge += f" LIMIT {tail.group('limit')}"
+
+    return {"partial": partial, "merge": merge}
+
+
+class ShardSet:
+    """Date-partitioned order shards: only partitions overlapping a query's window are read"""
+
+    def __init__(self, db_path: str, shard_dir: str, workers: int = None):
+        self.db_path = db_path
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.granularity = manifest["granularity"]
+        self.partitions = manifest["partitions"]
+        self.ingest_batch = manifest.get("ingest_batch", 0)
+        self.pool = ThreadPoolExecutor(max_workers=workers or min(32, len(self.partitions) or 1))
+
+    def partitions_for(self, query: str) -> Optional[List[str]]:
+        """Partition keys overlapping the query's date window, or None if it has no window"""
+        # The window must be a plain AND-ed filter on OrderDate to prune partitions safely
+        windows = BETWEEN_DATES.findall(query) + YEAR_EQUALS.findall(query)
+        on_order_date = (len(re.findall(r"OrderDate\s+BETWEEN", query, re.IGNORECASE))
+                         + len(re.findall(r"strftime\s*\(\s*'%Y'\s*,\s*[\w.]*OrderDate\s*\)", query, re.IGNORECASE)))
+        if not windows or on_order_date != len(windows) or re.search(r"\bOR\b", query, re.IGNORECASE):
+            return None
+        months = query_months(query)
+        if months is None:
+            return None
+        width = 4 if self.granularity == "year" else 7
+        wanted = {month[:width] for month in months}
+        if wanted & self.stale_partitions():
+            print("   → Shards are behind ingested orders for this window, using the full database")
+            return None
+        return [key for key in sorted(self.partitions) if key in wanted]
+
+    def stale_partitions(self) -> set:
+        """Partition keys with orders ingested after the shards were built"""
+        conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True)
+        try:
+            months = conn.execute(
+                "SELECT DISTINCT Month FROM ingest_log WHERE BatchID > ?", (self.ingest_batch,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No ingest_log: nothing has been ingested since the database was created
+            return set()
+        finally:
+            conn.close()
+        width = 4 if self.granularity == "year" else 7
+        return {month[:width] for (month,) in months if month}
+
+    def _connect(self, keys: List[str]) -> sqlite3.Connection:
+        """Main database (for dimensions) with the given partitions standing in for the order tables"""
+        conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True)
+        selects_orders, selects_details = [], []
+        for i, key in enumerate(keys):
+            path = os.path.abspath(os.path.join(self.shard_dir, self.partitions[key]))
+            conn.execute(f"ATTACH DATABASE ? AS p{i}", (f"file:{path}?mode=ro",))
+            selects_orders.append(f"SELECT * FROM p{i}.Orders")
+            selects_details.append(f'SELECT * FROM p{i}."Order Details"')
+
+        # Temp objects shadow the main tables/views of the same name
+        orders = " UNION ALL ".join(selects_orders) or "SELECT * FROM main.Orders WHERE 0"
+        details = " UNION ALL ".join(selects_details) or 'SELECT * FROM main."Order Details" WHERE 0'
+        conn.execute(f"CREATE TEMP VIEW orders AS {orders}")
+        conn.execute(f'CREATE TEMP VIEW "Order Details" AS {details}')
+        conn.execute(f"CREATE TEMP VIEW order_items AS {details}")
+        return conn
+
+    def _run_on(self, keys: List[str], query: str) -> Dict[str, Any]:
+        conn = self._connect(keys)
+        try:
+            return fetch_result(conn, query)
+        finally:
+            conn.close()
+
+    def run_query(self, query: str) -> Optional[Dict[str, Any]]:
+        """Run a date-bounded query on its partitions; None means use the full database"""
+        keys = self.partitions_for(query)
+        if keys is None:
+            return None
+        span = f"{keys[0]}..{keys[-1]}" if keys else "none"
+        print(f"   → Shards: {len(keys)} of {len(self.partitions)} partitions ({span})")
+
+        if len(keys) <= 1:
+            return self._run_on(keys, query)
+
+        split = split_aggregate(query)
+        if split is None:
+            # Not decomposable: read the overlapping partitions together in one query
+            if len(keys) >= MAX_ATTACHED:
+                print("   → Too many partitions to attach at once, using the full database")
+                return None
+            return self._run_on(keys, query)
+
+        # Fan out the partial aggregates in parallel, then merge them
+        partials = list(self.pool.map(lambda key: self._run_on([key], split["partial"]), keys))
+        failed = next((result for result in partials if not result["success"]), None)
+        if failed is not None:
+            print(f"   → Partial aggregate failed ({failed['error']}), using the full database")
+            return None
+
+        merge_conn = sqlite3.connect(":memory:")
+        try:
+            columns = partials[0]["columns"]
+            merge_conn.execute(f"CREATE TABLE partials ({', '.join(columns)})")
+            placeholders = ", ".join("?" for _ in columns)
+            for result in partials:
+                merge_conn.executemany(f"INSERT INTO partials VALUES ({placeholders})", result["rows"])
+            return fetch_result(merge_conn, split["merge"])
+        finally:
+            merge_conn.close()
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional
+
+
+def _reads_table(step: str) -> bool:
+    # Constant rows (SELECT without FROM) don't touch a table
+    return step.startswith(("SCAN", "SEARCH")) and "CONSTANT ROW" not in step
+
+
+def estimate_cost(conn, query: str) -> Dict[str, Any]:
+    """Estimate query cost from EXPLAIN QUERY PLAN (full scans, temp B-trees, joins)"""
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()]
+
+    # A covering index scan never touches the table rows, so it isn't counted as a full scan
+    full_scans = sum(1 for step in plan
+                     if step.startswith("SCAN") and _reads_table(step) and "COVERING INDEX" not in step)
+    temp_btrees = sum(1 for step in plan if "USE TEMP B-TREE" in step)
+    tables = sum(1 for step in plan if _reads_table(step))
+    joins = max(tables - 1, 0)
+
+    return {
+        "full_scans": full_scans,
+        "temp_btrees": temp_btrees,
+        "joins": joins,
+        "score": full_scans * 10 + temp_btrees * 3 + joins * 2,
+        "plan": plan
+    }
+
+
+class Lane:
+    """A queue with its own concurrency limit, queue depth and latency record"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, history: int = 1000):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = threading.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=history)
+
+    def admit(self, block: bool = False) -> bool:
+        """Reserve a queue position; False if the queue is already full (unless `block`)"""
+        with self._lock:
+            if not block and self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            return True
+
+    def acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+
+    def release(self, latency: float):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            self.latencies.append(latency)
+        self._slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                "waiting": self.waiting,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        stats.update({"p50_ms": percentile(0.50), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99)})
+        return stats
+
+
+class SQLScheduler:
+    """Admission control in front of SQLiteTool.run_query: cheap queries and expensive
+    queries run in separate lanes so batch load can't starve interactive questions"""
+
+    def __init__(self, sql_tool, slow_threshold: int = 15,
+                 fast_concurrency: int = 8, fast_queue: int = 64,
+                 slow_concurrency: int = 2, slow_queue: int = 8):
+        self.sql_tool = sql_tool
+        self.slow_threshold = slow_threshold
+        self.lanes = {
+            "fast": Lane("fast", fast_concurrency, fast_queue),
+            "slow": Lane("slow", slow_concurrency, slow_queue),
+        }
+        self._costs: Dict[str, Dict[str, Any]] = {}
+
+    def cost(self, query: str) -> Dict[str, Any]:
+        """Cost estimate for a query, cached by query text"""
+        if query not in self._costs:
+            if len(self._costs) > 4096:
+                self._costs.clear()
+            conn = self.sql_tool.connect()
+            try:
+                self._costs[query] = estimate_cost(conn, query)
+            finally:
+                conn.close()
+        return self._costs[query]
+
+    def lane_for(self, query: str) -> Lane:
+        try:
+            score = self.cost(query)["score"]
+        except Exception:
+            # Let run_query report the real error; unknown cost goes to the slow lane
+            score = self.slow_threshold
+        return self.lanes["slow" if score >= self.slow_threshold else "fast"]
+
+    def run_in_lane(self, lane: Lane, run: Callable[[], Any], block: bool = False) -> Optional[Any]:
+        """Call `run` once the lane has a free slot; None if the lane's queue is full.
+
+        With `block`, the call waits for a slot even when the queue is full.
+        """
+        if not lane.admit(block):
+            return None
+
+        start = time.perf_counter()
+        lane.acquire()
+        try:
+            return run()
+        finally:
+            lane.release(time.perf_counter() - start)
+
+    @staticmethod
+    def rejected(lane: Lane) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "columns": [],
+            "rows": [],
+            "row_count": 0,
+            "error": f"Rejected: {lane.name} lane queue is full ({lane.max_queue} waiting)"
+        }
+
+    def run_query(self, query: str) -> Dict[str, Any]:
+        """Execute a query through its lane, or reject it if that lane's queue is full"""
+        lane = self.lane_for(query)
+        result = self.run_in_lane(lane, lambda: self.sql_tool.run_query(query))
+        if result is None:
+            return self.rejected(lane)
+        return dict(result, lane=lane.name)
+
+    def run_group(self, group, run: Callable[[], List[Any]]) -> List[Any]:
+        """Run one planned batch group (see Tools/batch_planner.py) in the lane of its
+        most expensive query; `run` returns the group's (index, result) pairs.
+
+        Batch work waits for a slot instead of being rejected; only interactive
+        run_query calls are turned away when a lane is full.
+        """
+        slow = any(self.lane_for(member.query).name == "slow" for member in group.members)
+        lane = self.lanes["slow" if slow else "fast"]
+        pairs = self.run_in_lane(lane, run, block=True)
+        return [(index, dict(result, lane=lane.name)) for index, result in pairs]
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-lane queue depth, throughput and latency percentiles"""
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
+
+    def print_metrics(self):
+        for name, stats in self.metrics().items():
+            print(f"   {name:>4} lane: {stats['completed']} done, {stats['rejected']} rejected, "
+                  f"p50 {stats['p50_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms")
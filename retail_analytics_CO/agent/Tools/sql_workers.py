@@ -0,0 +1,113 @@
+import marshal
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from Tools.batch_planner import QueryGroup, execute_group
+
+# Connection opened once per worker process by the pool initializer
+_worker_conn: Optional[sqlite3.Connection] = None
+
+
+def _open_worker(db_path: str, immutable: bool, mmap_size: int):
+    """Pool initializer: open the database read-only in this worker"""
+    global _worker_conn
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    if immutable:
+        # Snapshots never change, so SQLite can skip locking and change detection
+        uri += "&immutable=1"
+    _worker_conn = sqlite3.connect(uri, uri=True)
+    _worker_conn.execute(f"PRAGMA mmap_size={mmap_size}")
+
+
+def _ready(_: int) -> int:
+    return os.getpid()
+
+
+def _run_group(group: QueryGroup) -> bytes:
+    """Execute one planned group in a worker and return the encoded results"""
+    encoded = []
+    for index, result in execute_group(_worker_conn, group):
+        # Columnar layout: one tuple of values per column instead of a tuple per row
+        values = tuple(zip(*result["rows"])) if result["rows"] else ()
+        encoded.append((index, result["success"], tuple(result["columns"]), values, result["error"]))
+    return marshal.dumps(encoded)
+
+
+def decode_results(payload: bytes) -> List[Any]:
+    """Turn a worker payload back into (index, result) pairs"""
+    decoded = []
+    for index, success, columns, values, error in marshal.loads(payload):
+        rows = list(zip(*values))
+        decoded.append((index, {
+            "success": success,
+            "columns": list(columns),
+            "rows": rows,
+            "row_count": len(rows),
+            "error": error
+        }))
+    return decoded
+
+
+class ProcessSQLExecutor:
+    """Runs planned query groups across a pool of read-only worker processes"""
+
+    def __init__(self, db_path: str = "Data/northwind.sqlite.db", workers: int = None,
+                 snapshot_dir: str = None, mmap_size: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count()
+        self.snapshot_path = None
+
+        source = db_path
+        if snapshot_dir:
+            self.snapshot_path = self._take_snapshot(snapshot_dir)
+            source = self.snapshot_path
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_open_worker,
+            initargs=(source, self.snapshot_path is not None, mmap_size)
+        )
+        # Start every worker now, from this thread: the pool otherwise forks on the first
+        # submit, possibly while other threads hold locks the children would inherit
+        list(self.pool.map(_ready, range(self.workers)))
+        print(f"✅ SQL worker pool started: {self.workers} processes reading {source}")
+
+    def _take_snapshot(self, snapshot_dir: str) -> str:
+        """Copy the database (e.g. into /dev/shm) with the backup API"""
+        name = os.path.basename(self.db_path)
+        snapshot_path = os.path.join(snapshot_dir, f"{name}.{os.getpid()}.snapshot")
+
+        src = sqlite3.connect(self.db_path)
+        dst = sqlite3.connect(snapshot_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        return snapshot_path
+
+    def run_plan(self, plan: List[QueryGroup], total: int) -> List[Dict[str, Any]]:
+        """Run every group of a batch plan in parallel, keeping the original order"""
+        results: List[Dict[str, Any]] = [None] * total
+        for payload in self.pool.map(_run_group, plan):
+            for index, result in decode_results(payload):
+                results[index] = result
+        return results
+
+    def run_group(self, group: QueryGroup) -> List[Any]:
+        """Run one planned group on a worker and return its (index, result) pairs"""
+        return decode_results(self.pool.submit(_run_group, group).result())
+
+    def close(self):
+        """Stop the workers and remove the snapshot, if any"""
+        self.pool.shutdown()
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
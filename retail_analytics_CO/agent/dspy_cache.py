@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+
+
+class PredictionCache:
+    """Content-addressed cache of module predictions, persisted in a local SQLite file"""
+
+    def __init__(self, path: str = ".cache/dspy_predictions.sqlite", max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, outputs TEXT, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_last_used ON predictions(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(signature: str, inputs: Dict[str, Any], model_id: str, program: Any = None) -> str:
+        """Hash of signature name, inputs, model id and program state (instructions, fields, demos)"""
+        payload = json.dumps({"signature": signature, "inputs": inputs, "model": model_id, "program": program},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT outputs FROM predictions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE predictions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, outputs: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, outputs, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(outputs, default=str), time.time())
+            )
+            # Evict least recently used entries beyond the limit
+            self._conn.execute(
+                """DELETE FROM predictions WHERE key IN (
+                       SELECT key FROM predictions ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LocalModelServer:
+    """Stand-in for a local model server that accepts a batch of requests in one call.
+
+    `batch_fn` receives the whole batch (e.g. a client for the server's batch endpoint);
+    without one, the requests of a batch are sent to the predictor concurrently.
+    """
+
+    def __init__(self, predictor: Callable[..., Any],
+                 batch_fn: Optional[Callable[[List[Dict[str, Any]]], List[Any]]] = None,
+                 max_parallel: int = 16):
+        self.predictor = predictor
+        self.batch_fn = batch_fn
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel) if batch_fn is None else None
+
+    def __call__(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        if self.batch_fn is not None:
+            return self.batch_fn(batch)
+        return list(self._pool.map(lambda inputs: self.predictor(**inputs), batch))
+
+
+class MicroBatcher:
+    """Groups concurrent calls into batches of up to `max_batch`, waiting at most `max_wait_ms`"""
+
+    def __init__(self, batch_fn: Callable[[List[Dict[str, Any]]], List[Any]],
+                 max_batch: int = 16, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, daemon=True)
+        self._worker.start()
+
+    def submit(self, inputs: Dict[str, Any]) -> Any:
+        """Queue one request and block until its batch has been answered"""
+        future: Future = Future()
+        self._requests.put((inputs, future))
+        return future.result()
+
+    def _loop(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                outputs = self.batch_fn([inputs for inputs, _ in batch])
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
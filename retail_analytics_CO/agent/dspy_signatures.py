@@ -1,5 +1,8 @@
+import threading
 import dspy
-from typing import List, Optional
+from typing import List, Optional, Callable
+
+from dspy_cache import PredictionCache, LocalModelServer, MicroBatcher
 
 # Initialize DSPy with local model (we'll set this up later)
 # For now, we'll create the signature classes
@@ -34,30 +37,88 @@ class SynthesizeAnswer(dspy.Signature):
     explanation: str = dspy.OutputField(desc="Brief explanation of the answer")
     citations: List[str] = dspy.OutputField(desc="List of sources used")
 
-# DSPy Modules
-class QueryRouter(dspy.Module):
-    def __init__(self):
+def current_model_id() -> str:
+    """Identifier of the configured language model, part of every cache key"""
+    lm = dspy.settings.lm
+    return str(getattr(lm, 'model', None) or lm)
+
+def program_state(predictor) -> dict:
+    """Instructions, fields and demos of a predictor, so optimised programs get their own cache keys"""
+    signature = predictor.signature
+    return {
+        "instructions": signature.instructions,
+        "fields": {name: [str(field.annotation), field.json_schema_extra]
+                   for name, field in signature.fields.items()},
+        "demos": [demo.toDict() if hasattr(demo, 'toDict') else demo for demo in predictor.demos],
+    }
+
+# Module-level so CachedModule instances stay deep-copyable for DSPy optimizers
+_batchers_lock = threading.Lock()
+
+class CachedModule(dspy.Module):
+    """Base for modules whose predictions are cached and optionally micro-batched"""
+    def __init__(self, cache: Optional[PredictionCache] = None, max_batch: int = 0, max_wait_ms: float = 5.0,
+                 batch_fn: Optional[Callable] = None):
         super().__init__()
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        # Sends a whole batch to the model server in one call; see LocalModelServer
+        self.batch_fn = batch_fn
+        self._batchers = {}
+    
+    def _predict(self, predictor, signature, **inputs):
+        key = None
+        if self.cache is not None:
+            key = PredictionCache.make_key(signature.__name__, inputs, current_model_id(),
+                                           program_state(predictor))
+            outputs = self.cache.get(key)
+            if outputs is not None:
+                return dspy.Prediction(**outputs)
+        
+        if self.max_batch:
+            with _batchers_lock:
+                # Concurrent first calls must share one batcher, or batches get split
+                if signature not in self._batchers:
+                    server = LocalModelServer(predictor, self.batch_fn, max_parallel=self.max_batch)
+                    self._batchers[signature] = MicroBatcher(server, self.max_batch, self.max_wait_ms)
+            prediction = self._batchers[signature].submit(inputs)
+        else:
+            prediction = predictor(**inputs)
+        
+        if self.cache is not None:
+            self.cache.put(key, prediction.toDict())
+        return prediction
+
+# DSPy Modules
+class QueryRouter(CachedModule):
+    def __init__(self, cache: Optional[PredictionCache] = None, max_batch: int = 0,
+                 batch_fn: Optional[Callable] = None):
+        super().__init__(cache, max_batch, batch_fn=batch_fn)
         self.route = dspy.Predict(RouteQuery)
     
     def forward(self, question):
-        return self.route(question=question)
+        return self._predict(self.route, RouteQuery, question=question)
 
-class SQLGenerator(dspy.Module):
-    def __init__(self):
-        super().__init__()
+class SQLGenerator(CachedModule):
+    def __init__(self, cache: Optional[PredictionCache] = None, max_batch: int = 0,
+                 batch_fn: Optional[Callable] = None):
+        super().__init__(cache, max_batch, batch_fn=batch_fn)
         self.generate_sql = dspy.Predict(GenerateSQL)
     
     def forward(self, question, schema):
-        return self.generate_sql(question=question, schema=schema)
+        return self._predict(self.generate_sql, GenerateSQL, question=question, schema=schema)
 
-class AnswerSynthesizer(dspy.Module):
-    def __init__(self):
-        super().__init__()
+class AnswerSynthesizer(CachedModule):
+    def __init__(self, cache: Optional[PredictionCache] = None, max_batch: int = 0,
+                 batch_fn: Optional[Callable] = None):
+        super().__init__(cache, max_batch, batch_fn=batch_fn)
         self.synthesize = dspy.Predict(SynthesizeAnswer)
     
     def forward(self, question, sql_results, document_context, format_hint):
-        return self.synthesize(
+        return self._predict(
+            self.synthesize,
+            SynthesizeAnswer,
             question=question,
             sql_results=sql_results,
             document_context=document_context,
@@ -76,4 +137,5 @@ if __name__ == "__main__":
     print("\nAvailable modules:")
     print("  - QueryRouter")
     print("  - SQLGenerator")
-    print("  - AnswerSynthesizer")
\ No newline at end of file
+    print("  - AnswerSynthesizer")
+    print("\nAll modules accept cache=PredictionCache() and max_batch=N (and batch_fn) for micro-batching")
\ No newline at end of file
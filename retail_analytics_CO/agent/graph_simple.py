@@ -1,9 +1,20 @@
 from typing import Dict, Any, List
 import os
 import sqlite3
-import re
+import threading
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from array import array
 from dataclasses import dataclass
 
+from Rag.streaming import ingest_documents
+from Tools.analytic_schema import apply_analytic_schema
+from Tools.batch_planner import plan_batch, execute_plan, execute_group
+from Tools.result_cache import ResultCache
+from Tools.sampling import estimate_kpi
+from Tools.sharding import ShardSet
+from Tools.sql_scheduler import SQLScheduler
+
 print(" Starting Simple Hybrid Agent...")
 
 # Simple data classes
@@ -15,6 +26,8 @@ class RouteResult:
 class SQLResult:
     sql_query: str
     explanation: str = ""
+    # KPI spec answerable from the stratified samples (see Tools/sampling.py), if any
+    approx: Dict[str, Any] = None
 
 @dataclass
 class SynthesisResult:
@@ -22,79 +35,158 @@ class SynthesisResult:
     explanation: str
     citations: List[str]
 
+class SearchHit:
+    """A scored chunk; source, id and content are looked up from the retriever on access"""
+    __slots__ = ('index', 'score', '_retriever')
+    
+    def __init__(self, retriever: "SimpleRetriever", index: int, score: int):
+        self._retriever = retriever
+        self.index = index
+        self.score = score
+    
+    @property
+    def source(self) -> str:
+        return self._retriever.sources[self._retriever.chunk_source[self.index]]
+    
+    @property
+    def chunk_id(self) -> str:
+        chunk_id = f"{self.source}::chunk{self._retriever.chunk_number[self.index]}"
+        part = self._retriever.chunk_part[self.index]
+        # Long paragraphs are split into overlapping parts: chunk3, chunk3.1, chunk3.2, ...
+        return f"{chunk_id}.{part}" if part else chunk_id
+    
+    @property
+    def content(self) -> str:
+        return self._retriever.chunks[self.index]
+    
+    def __getitem__(self, key: str):
+        # Dict-style access, as search results used to be dicts
+        return getattr(self, key)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'source': self.source, 'chunk_id': self.chunk_id, 'content': self.content, 'score': self.score}
+    
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
 # Simple Retriever (included in same file)
 class SimpleRetriever:
     def __init__(self, docs_folder: str = "Docs"):
         self.docs_folder = docs_folder
+        # Chunk text lives once in `chunks`; per-chunk metadata is kept in compact arrays
         self.chunks = []
-        self.chunk_info = []
+        self.sources = []
+        self.chunk_source = array('I')
+        self.chunk_number = array('I')
+        self.chunk_part = array('I')
         
-    def load_documents(self):
-        """Load and chunk all documents"""
+    def load_documents(self, workers: int = 1, max_chars: int = 2000, overlap: int = 200):
+        """Stream and chunk all documents into the index (see Rag/streaming.py)"""
         if not os.path.exists(self.docs_folder):
             print(f"❌ Docs folder not found: {self.docs_folder}")
             return
-            
-        md_files = [f for f in os.listdir(self.docs_folder) if f.endswith('.md') or f.endswith('.txt')]
         
-        for file_name in md_files:
-            file_path = os.path.join(self.docs_folder, file_name)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                paragraphs = re.split(r'\n\s*\n|#+ ', content)
-                
-                for i, paragraph in enumerate(paragraphs):
-                    if paragraph.strip():
-                        self.chunks.append(paragraph.strip())
-                        self.chunk_info.append({
-                            'source': file_name.replace('.txt', ''),
-                            'chunk_id': f"{file_name.replace('.txt', '')}::chunk{i}",
-                            'content': paragraph.strip()
-                        })
-            except Exception as e:
-                print(f"Error loading {file_name}: {e}")
+        file_count = ingest_documents(self, self.docs_folder, workers, max_chars, overlap)
         
-        print(f"✅ Loaded {len(self.chunks)} chunks from {len(md_files)} files")
+        print(f"✅ Loaded {len(self.chunks)} chunks from {file_count} files")
     
-    def simple_search(self, query: str, top_k: int = 3) -> List[Dict]:
+    def simple_search(self, query: str, top_k: int = 3) -> List[SearchHit]:
         """Simple keyword-based search"""
         if not self.chunks:
             self.load_documents()
         
-        query_words = query.lower().split()
-        results = []
+        query_words = [word for word in query.lower().split() if len(word) > 2]
+        scored = []
         
         for i, chunk in enumerate(self.chunks):
             chunk_lower = chunk.lower()
             score = 0
             
             for word in query_words:
-                if len(word) > 2 and word in chunk_lower:
+                if word in chunk_lower:
                     score += 1
             
             if score > 0:
-                results.append({
-                    **self.chunk_info[i],
-                    'score': score
-                })
+                scored.append((score, i))
         
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:top_k]
+        # Same order as a stable sort by score; hits are only built for the top-k
+        top = heapq.nlargest(top_k, scored, key=lambda x: x[0])
+        return [SearchHit(self, i, score) for score, i in top]
 
 # Simple SQL Tool (included in same file)
 class SQLiteTool:
-    def __init__(self, db_path: str = "Data/northwind.sqlite.db"):
+    def __init__(self, db_path: str = "Data/northwind.sqlite.db", in_memory: bool = False,
+                 reload_interval: float = None, cache_results: bool = False, shard_dir: str = None):
         self.db_path = db_path
+        self.in_memory = in_memory
+        self.result_cache = ResultCache() if cache_results else None
+        self.shards = ShardSet(db_path, shard_dir) if shard_dir else None
+        self._memory_uri = None
+        self._anchor = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop_reload = threading.Event()
+        
+        if in_memory:
+            self.reload()
+            if reload_interval:
+                thread = threading.Thread(target=self._reload_loop, args=(reload_interval,), daemon=True)
+                thread.start()
+    
+    def reload(self):
+        """Load a fresh snapshot of the database file into shared memory"""
+        if not os.path.exists(self.db_path):
+            print(f"❌ Database not found: {self.db_path}")
+            return
+        
+        # Manual reloads can overlap the periodic one; each needs its own database name
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        uri = f"file:northwind_{id(self)}_{generation}?mode=memory&cache=shared"
+        
+        # The anchor connection keeps the in-memory database alive
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(self.db_path)
+        try:
+            source.backup(anchor)
+        finally:
+            source.close()
+        apply_analytic_schema(anchor)
+        
+        # Swap in the new snapshot; connections already open keep reading the old one
+        with self._lock:
+            old_anchor = self._anchor
+            self._anchor, self._memory_uri = anchor, uri
+        if old_anchor is not None:
+            old_anchor.close()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        print(f"✅ Loaded {self.db_path} into memory (snapshot {generation})")
+    
+    def _reload_loop(self, interval: float):
+        """Reload the in-memory snapshot every `interval` seconds"""
+        while not self._stop_reload.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Warning: In-memory reload failed: {e}")
+    
+    def close(self):
+        """Stop periodic reloads and release the in-memory database"""
+        self._stop_reload.set()
+        with self._lock:
+            anchor, self._anchor = self._anchor, None
+        if anchor is not None:
+            anchor.close()
         
     def get_schema(self) -> Dict[str, List[str]]:
         """Get database schema information"""
-        if not os.path.exists(self.db_path):
+        if self._memory_uri is None and not os.path.exists(self.db_path):
             print(f"❌ Database not found: {self.db_path}")
             return {}
             
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
@@ -118,26 +210,80 @@ class SQLiteTool:
         conn.close()
         return schema
     
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection to the database (or its in-memory snapshot)"""
+        if self.in_memory:
+            # Opened under the lock so reload() can't close the last handle on this
+            # snapshot first, which would leave the URI pointing at a new empty database
+            with self._lock:
+                return sqlite3.connect(self._memory_uri, uri=True)
+        return sqlite3.connect(self.db_path)
+    
     def run_query(self, query: str) -> Dict[str, Any]:
         """Execute SQL query and return results"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self.connect()
             
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
+            if self.result_cache is not None:
+                self.result_cache.sync(conn)
+                cached = self.result_cache.get(query)
+                if cached is not None:
+                    conn.close()
+                    return cached
+            
+            # Date-bounded queries only read the order partitions they overlap
+            result = self.shards.run_query(query) if self.shards is not None else None
+            
+            if result is None:
+                cursor = conn.cursor()
+                
+                cursor.execute(query)
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+                
+                result = {
+                    "success": True,
+                    "columns": columns,
+                    "rows": rows,
+                    "row_count": len(rows),
+                    "error": None
+                }
             
             conn.close()
             
+            if self.result_cache is not None and result["success"]:
+                self.result_cache.put(query, result)
+            return result
+            
+        except Exception as e:
             return {
-                "success": True,
-                "columns": columns,
-                "rows": rows,
-                "row_count": len(rows),
-                "error": None
+                "success": False,
+                "columns": [],
+                "rows": [],
+                "row_count": 0,
+                "error": str(e)
             }
+    
+    def run_approximate(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a KPI spec from the stratified samples, with a confidence interval"""
+        try:
+            conn = self.connect()
+            try:
+                approx = estimate_kpi(conn, spec["kpi"], spec["start"], spec["end"], spec.get("category"))
+            finally:
+                conn.close()
             
+            if not approx["strata"]:
+                raise ValueError("no sampled order lines for this window (run build_samples.py)")
+            
+            return {
+                "success": True,
+                "columns": [spec["kpi"]],
+                "rows": [(round(approx["estimate"], 2),)],
+                "row_count": 1,
+                "error": None,
+                "approximate": approx
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -146,6 +292,59 @@ class SQLiteTool:
                 "row_count": 0,
                 "error": str(e)
             }
+    
+    def run_batch(self, queries: List[str], executor=None, share_scans: bool = True,
+                  scheduler: SQLScheduler = None) -> List[Dict[str, Any]]:
+        """Execute a batch of queries, sharing one scan per base relation"""
+        if self.shards is None:
+            return self._run_plan(queries, executor, share_scans, scheduler)
+        
+        # Date-bounded queries read only their partitions instead of joining a shared scan
+        results: List[Dict[str, Any]] = [None] * len(queries)
+        rest = []
+        for i, query in enumerate(queries):
+            if self.shards.partitions_for(query) is not None:
+                results[i] = (scheduler or self).run_query(query)
+            else:
+                rest.append(i)
+        if rest:
+            for i, result in zip(rest, self._run_plan([queries[i] for i in rest], executor, share_scans, scheduler)):
+                results[i] = result
+        return results
+    
+    def _run_plan(self, queries: List[str], executor=None, share_scans: bool = True,
+                  scheduler: SQLScheduler = None) -> List[Dict[str, Any]]:
+        plan = plan_batch(queries, share_scans)
+        shared = sum(len(group.members) for group in plan if group.rewritten)
+        print(f" Batch plan: {len(queries)} queries in {len(plan)} scans ({shared} sharing a scan)")
+        
+        if scheduler is None:
+            # Optional process pool (see Tools/sql_workers.py) runs the scans in parallel
+            if executor is not None:
+                return executor.run_plan(plan, len(queries))
+            
+            conn = self.connect()
+            try:
+                return execute_plan(conn, plan, len(queries))
+            finally:
+                conn.close()
+        
+        def run_group(group):
+            if executor is not None:
+                return executor.run_group(group)
+            conn = self.connect()
+            try:
+                return execute_group(conn, group)
+            finally:
+                conn.close()
+        
+        # Each scan waits for a slot in the lane of its most expensive query
+        results: List[Dict[str, Any]] = [None] * len(queries)
+        with ThreadPoolExecutor(max_workers=executor.workers if executor is not None else 1) as pool:
+            for pairs in pool.map(lambda group: scheduler.run_group(group, lambda: run_group(group)), plan):
+                for index, result in pairs:
+                    results[index] = result
+        return results
 
 # Simple DSPy-like modules
 class QueryRouter:
@@ -197,7 +396,8 @@ class SQLGenerator:
             JOIN orders o ON od.OrderID = o.OrderID
             WHERE o.OrderDate BETWEEN '1997-12-01' AND '1997-12-31'
             """
-            return SQLResult(sql_query=sql, explanation="AOV during Winter Classics 1997")
+            return SQLResult(sql_query=sql, explanation="AOV during Winter Classics 1997",
+                             approx={"kpi": "aov", "start": "1997-12-01", "end": "1997-12-31"})
         
         # Question 4: Top 3 products by revenue
         elif "top 3 products" in question_lower and "revenue" in question_lower:
@@ -223,7 +423,9 @@ class SQLGenerator:
             WHERE c.CategoryName = 'Beverages'
             AND o.OrderDate BETWEEN '1997-06-01' AND '1997-06-30'
             """
-            return SQLResult(sql_query=sql, explanation="Beverages revenue during Summer 1997")
+            return SQLResult(sql_query=sql, explanation="Beverages revenue during Summer 1997",
+                             approx={"kpi": "revenue", "start": "1997-06-01", "end": "1997-06-30",
+                                     "category": "Beverages"})
         
         # Question 6: Top customer by margin in 1997
         elif "customer" in question_lower and "margin" in question_lower and "1997" in question_lower:
@@ -298,6 +500,9 @@ class AnswerSynthesizer:
         )
 # Main Agent Class
 class HybridAgentState:
+    __slots__ = ('question', 'route', 'document_results', 'sql_query', 'sql_results', 'final_answer',
+                 'explanation', 'citations', 'confidence', 'errors', 'attempts', 'approx_spec')
+    
     def __init__(self):
         self.question = ""
         self.route = ""
@@ -310,19 +515,27 @@ class HybridAgentState:
         self.confidence = 0.0
         self.errors = []
         self.attempts = 0
+        self.approx_spec = None
 
 class SimpleHybridAgent:
-    def __init__(self):
+    def __init__(self, sql_tool: SQLiteTool = None, scheduler: SQLScheduler = None):
         print(" Initializing Simple Hybrid Agent...")
         self.retriever = SimpleRetriever()
-        self.sql_tool = SQLiteTool()
+        self.sql_tool = sql_tool or SQLiteTool()
+        # Optional admission control / fast-slow lanes in front of run_query
+        self.scheduler = scheduler
         self.router = QueryRouter()
         self.sql_generator = SQLGenerator()
         self.synthesizer = AnswerSynthesizer()
         print("✅ Agent initialized successfully!")
     
-    def run(self, question: str) -> Dict[str, Any]:
-        """Run the agent on a question"""
+    def run(self, question: str, approximate: bool = False) -> Dict[str, Any]:
+        """Run the agent on a question (approximate=True answers KPIs from samples)"""
+        state = self.prepare(question)
+        return self.finish(state, approximate=approximate)
+    
+    def prepare(self, question: str) -> HybridAgentState:
+        """Route, retrieve and generate SQL without executing it"""
         print(f"\n{'='*50}")
         print(f" Processing: {question}")
         print(f"{'='*50}")
@@ -349,15 +562,35 @@ class SimpleHybridAgent:
             schema = self.sql_tool.get_schema()
             sql_result = self.sql_generator.predict(question, str(schema))
             state.sql_query = sql_result.sql_query
+            state.approx_spec = sql_result.approx
             print(f"   → SQL: {sql_result.explanation}")
         
+        return state
+    
+    def finish(self, state: HybridAgentState, sql_result: Dict[str, Any] = None,
+               approximate: bool = False) -> Dict[str, Any]:
+        """Execute SQL (unless already executed in a batch) and synthesize the answer"""
+        question = state.question
+        
         # Node 4: Execute SQL
         if state.sql_query:
             print(" Executing SQL...")
-            result = self.sql_tool.run_query(state.sql_query)
+            result = None
+            if approximate and state.approx_spec:
+                result = self.sql_tool.run_approximate(state.approx_spec)
+                if not result["success"]:
+                    print(f"   → Approximate answer unavailable ({result['error']}), running exact SQL")
+                    result = None
+            if result is None:
+                runner = self.scheduler or self.sql_tool
+                result = sql_result if sql_result is not None else runner.run_query(state.sql_query)
             state.sql_results = result
             
-            if result["success"]:
+            if result["success"] and "approximate" in result:
+                approx = result["approximate"]
+                print(f"   → Approximate: {approx['estimate']:.2f} ± {approx['margin']:.2f}")
+                state.confidence = round(max(0.1, 0.9 - approx["relative_error"]), 2)
+            elif result["success"]:
                 print(f"   → Success: {result['row_count']} rows")
                 state.confidence = 0.9
             else:
@@ -380,6 +613,14 @@ class SimpleHybridAgent:
         state.explanation = synthesis_result.explanation
         state.citations = synthesis_result.citations
         
+        if state.sql_results and "approximate" in state.sql_results:
+            approx = state.sql_results["approximate"]
+            state.explanation += (
+                f" (approximate: {approx['estimate']:.2f} ± {approx['margin']:.2f}, "
+                f"95% CI [{approx['ci_low']:.2f}, {approx['ci_high']:.2f}] "
+                f"from {approx['sample_rows']} sampled order lines)"
+            )
+        
         print("✅ Processing complete!")
         
         return {
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Build stratified order-line samples for approximate answers
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'agent'))
+
+from Tools.sampling import build_samples
+
+def main():
+    """Main CLI entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Build stratified samples (by category and month) of order lines')
+    parser.add_argument('--db', type=str, default='Data/northwind.sqlite.db', help='Database file')
+    parser.add_argument('--fraction', type=float, default=0.01, help='Fraction of lines to sample per stratum')
+    parser.add_argument('--min-per-stratum', type=int, default=30, help='Minimum sampled lines per stratum')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"❌ Database file not found at: {args.db}")
+        return
+    
+    start = time.time()
+    conn = sqlite3.connect(args.db)
+    sampled, population = build_samples(conn, args.fraction, args.min_per_stratum)
+    conn.close()
+    
+    print(f"✅ Sampled {sampled} of {population} order lines in {time.time() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Split order history into per-year or per-month SQLite shards
+"""
+
+import os
+import sys
+import time
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'agent'))
+
+from Tools.sharding import build_shards
+
+def main():
+    """Main CLI entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Partition Orders / Order Details by date')
+    parser.add_argument('--db', type=str, default='Data/northwind.sqlite.db', help='Database file')
+    parser.add_argument('--out', type=str, default='Data/shards', help='Directory for the shard files')
+    parser.add_argument('--granularity', choices=['year', 'month'], default='year', help='Partition size')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"❌ Database file not found at: {args.db}")
+        return
+    
+    start = time.time()
+    partitions = build_shards(args.db, args.out, args.granularity)
+    print(f"✅ Built {len(partitions)} {args.granularity} shards in {args.out} ({time.time() - start:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import sqlite3
 import os
+import sys
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'agent'))
+
+from Tools.analytic_schema import apply_analytic_schema, build_aggregates
 
 def create_views():
-    """Create simplified views for database tables"""
+    """Create simplified views and analytic indexes for database tables"""
     
     db_path = 'Data/northwind.sqlite.db'
     
@@ -13,30 +19,16 @@ def create_views():
     print(f"✅ Database found at: {db_path}")
     
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
     
-    # List of views to create
-    views_sql = [
-        "CREATE VIEW IF NOT EXISTS orders AS SELECT * FROM Orders;",
-        "CREATE VIEW IF NOT EXISTS order_items AS SELECT * FROM \"Order Details\";", 
-        "CREATE VIEW IF NOT EXISTS products AS SELECT * FROM Products;",
-        "CREATE VIEW IF NOT EXISTS customers AS SELECT * FROM Customers;",
-        "CREATE VIEW IF NOT EXISTS categories AS SELECT * FROM Categories;",
-        "CREATE VIEW IF NOT EXISTS suppliers AS SELECT * FROM Suppliers;"
-    ]
+    print("Creating views and indexes...")
+    apply_analytic_schema(conn, verbose=True)
     
-    print("Creating views...")
-    for sql in views_sql:
-        try:
-            cursor.execute(sql)
-            view_name = sql.split(' ')[5]
-            print(f"✅ {view_name} - created")
-        except Exception as e:
-            print(f"❌ Error in {sql}: {e}")
+    print("Building monthly aggregates...")
+    build_aggregates(conn)
+    print("✅ agg_category_month, agg_product_month - built")
     
-    conn.commit()
     conn.close()
     print(" All views created successfully!")
 
 if __name__ == "__main__":
-    create_views()
\ No newline at end of file
+    create_views()
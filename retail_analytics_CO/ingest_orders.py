@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Incremental ingestion of new orders and order lines
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import List, Dict, Any
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'agent'))
+
+from Tools.analytic_schema import AGGREGATES_SQL, AGGREGATE_DELTAS_SQL, build_aggregates
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Read records from a CSV or JSONL file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Column names of a table, in table order"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+def insert_many(conn: sqlite3.Connection, table: str, records: List[Dict[str, Any]], columns: List[str]):
+    """Bulk insert records, keeping only the given columns"""
+    placeholders = ", ".join("?" for _ in columns)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    conn.executemany(
+        f'INSERT INTO {table} ({column_list}) VALUES ({placeholders})',
+        [tuple(record.get(column) for column in columns) for record in records]
+    )
+
+def ingest_batch(conn: sqlite3.Connection, orders: List[Dict[str, Any]],
+                 details: List[Dict[str, Any]]) -> List[str]:
+    """Append one batch of orders/order lines and apply aggregate deltas in one transaction.
+
+    Returns the months ('YYYY-MM') the batch touched.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if not {"agg_category_month", "agg_product_month"} <= existing:
+        # Deltas only make sense on top of aggregates that already cover the history
+        print(" Aggregate tables missing, building them from the full order history")
+        build_aggregates(conn)
+    for sql in AGGREGATES_SQL:
+        conn.execute(sql)
+    conn.commit()
+
+    order_columns = [c for c in table_columns(conn, "Orders") if any(c in r for r in orders)]
+    detail_columns = [c for c in table_columns(conn, "Order Details") if any(c in r for r in details)]
+
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp._new_orders")
+        conn.execute("CREATE TEMP TABLE _new_orders (OrderID INTEGER)")
+        if orders:
+            insert_many(conn, "Orders", orders, order_columns)
+            insert_many(conn, "temp._new_orders", orders, ["OrderID"])
+
+        # Stage the new lines so the aggregate deltas only look at this batch
+        conn.execute("DROP TABLE IF EXISTS temp._new_details")
+        conn.execute('CREATE TEMP TABLE _new_details AS SELECT * FROM "Order Details" WHERE 0')
+        if details:
+            insert_many(conn, "temp._new_details", details, detail_columns)
+            insert_many(conn, '"Order Details"', details, detail_columns)
+
+        for sql in AGGREGATE_DELTAS_SQL:
+            conn.execute(sql)
+
+        # New orders change order counts even without lines, so their months count too
+        months = [row[0] for row in conn.execute(
+            """SELECT DISTINCT strftime('%Y-%m', o.OrderDate) FROM Orders o
+               WHERE o.OrderID IN (SELECT OrderID FROM temp._new_details
+                                   UNION SELECT OrderID FROM temp._new_orders)
+                 AND o.OrderDate IS NOT NULL
+               ORDER BY 1"""
+        )]
+
+        # Record touched months so result caches can drop just those entries
+        batch_id = conn.execute("SELECT COALESCE(MAX(BatchID), 0) + 1 FROM ingest_log").fetchone()[0]
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        conn.executemany(
+            "INSERT INTO ingest_log (BatchID, Month, IngestedAt) VALUES (?, ?, ?)",
+            [(batch_id, month, ingested_at) for month in months]
+        )
+        conn.execute("DROP TABLE temp._new_details")
+        conn.execute("DROP TABLE temp._new_orders")
+
+    return months
+
+def ingest_files(db_path: str, orders_file: str = None, details_file: str = None, batch_size: int = 10000):
+    """Ingest order/order-detail files into the database in batches"""
+    if not os.path.exists(db_path):
+        print(f"❌ Database file not found at: {db_path}")
+        return
+
+    orders = read_records(orders_file) if orders_file else []
+    details = read_records(details_file) if details_file else []
+    print(f" Ingesting {len(orders)} orders and {len(details)} order lines into {db_path}")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    # Order lines are batched with their orders so every delta can see its OrderDate
+    details_by_order = {}
+    for detail in details:
+        details_by_order.setdefault(str(detail.get("OrderID")), []).append(detail)
+
+    start = time.time()
+    touched = set()
+    order_batches = [orders[i:i + batch_size] for i in range(0, len(orders), batch_size)]
+    for batch in order_batches:
+        batch_details = [d for order in batch for d in details_by_order.pop(str(order.get("OrderID")), [])]
+        touched.update(ingest_batch(conn, batch, batch_details))
+
+    # Lines for orders already in the database
+    leftover = [d for lines in details_by_order.values() for d in lines]
+    for i in range(0, len(leftover), batch_size):
+        touched.update(ingest_batch(conn, [], leftover[i:i + batch_size]))
+
+    conn.close()
+    elapsed = time.time() - start
+    print(f"✅ Ingested in {elapsed:.2f}s; months updated: {sorted(touched)}")
+
+def main():
+    """Main CLI entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Append new orders and update aggregates')
+    parser.add_argument('--db', type=str, default='Data/northwind.sqlite.db', help='Database file')
+    parser.add_argument('--orders', type=str, help='CSV/JSONL file of new Orders rows')
+    parser.add_argument('--details', type=str, help='CSV/JSONL file of new Order Details rows')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Orders per transaction')
+
+    args = parser.parse_args()
+
+    if not args.orders and not args.details:
+        parser.print_help()
+        return
+
+    ingest_files(args.db, args.orders, args.details, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -11,55 +11,93 @@ from typing import List, Dict, Any
 # Add agent directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'agent'))
 
-from agent.graph_simple import SimpleHybridAgent
+from agent.graph_simple import SimpleHybridAgent, SQLiteTool
+from Tools.sql_workers import ProcessSQLExecutor
+from Tools.sql_scheduler import SQLScheduler
 
-def process_batch_questions(input_file: str, output_file: str):
+def process_batch_questions(input_file: str, output_file: str, share_scans: bool = True,
+                            workers: int = 0, snapshot_dir: str = None, in_memory: bool = False,
+                            approximate: bool = False, schedule: bool = False, shard_dir: str = None):
     """Process a batch of questions from JSONL file"""
     print(f" Processing batch: {input_file}")
     
-    agent = SimpleHybridAgent()
+    sql_tool = SQLiteTool(in_memory=in_memory, shard_dir=shard_dir)
+    agent = SimpleHybridAgent(sql_tool, SQLScheduler(sql_tool) if schedule else None)
     results = []
+    prepared = []
     
-    # Read questions from file
+    # Read questions from file and plan each one (route, retrieve, generate SQL)
     with open(input_file, 'r', encoding='utf-8') as f:
         for line in f:
             if line.strip():
+                question_data = {}
                 try:
                     question_data = json.loads(line.strip())
                     question_id = question_data.get('id', 'unknown')
                     question = question_data.get('question', '')
-                    format_hint = question_data.get('format_hint', 'text')
                     
                     print(f"\n Processing: {question_id}")
                     print(f"   Question: {question}")
                     
-                    # Process the question
-                    result = agent.run(question)
-                    
-                    # Prepare output according to contract
-                    output = {
-                        "id": question_id,
-                        "final_answer": result["final_answer"],
-                        "sql": result["sql"],
-                        "confidence": result["confidence"],
-                        "explanation": result["explanation"],
-                        "citations": result["citations"]
-                    }
-                    
-                    results.append(output)
-                    print(f"   ✅ Completed: {question_id}")
+                    prepared.append((question_data, agent.prepare(question), None))
                     
                 except Exception as e:
                     print(f"   ❌ Error processing question: {e}")
-                    # Add error result
-                    results.append({
-                        "id": question_data.get('id', 'unknown'),
-                        "final_answer": f"Error: {str(e)}",
-                        "sql": "",
-                        "confidence": 0.0,
-                        "explanation": "Processing failed",
-                        "citations": []
-                    })
+                    prepared.append((question_data, None, e))
+    
+    # Execute all generated SQL together so similar questions share a scan
+    sql_results = {}
+    if share_scans or workers:
+        # Questions answered from samples in approximate mode don't need the exact scan
+        batch = [(i, state.sql_query) for i, (_, state, _) in enumerate(prepared)
+                 if state and state.sql_query and not (approximate and state.approx_spec)]
+        if batch:
+            queries = [query for _, query in batch]
+            try:
+                if workers:
+                    with ProcessSQLExecutor(agent.sql_tool.db_path, workers, snapshot_dir) as executor:
+                        batch_results = agent.sql_tool.run_batch(queries, executor, share_scans, agent.scheduler)
+                else:
+                    batch_results = agent.sql_tool.run_batch(queries, scheduler=agent.scheduler)
+                sql_results = {i: result for (i, _), result in zip(batch, batch_results)}
+            except Exception as e:
+                # e.g. workers that can't open the database break the pool; each
+                # question then runs its own SQL and reports its own error
+                print(f"   ❌ Batch SQL failed, running each question's SQL on its own: {e}")
+    
+    for i, (question_data, state, error) in enumerate(prepared):
+        question_id = question_data.get('id', 'unknown')
+        try:
+            if error is not None:
+                raise error
+            
+            # Process the question
+            result = agent.finish(state, sql_results.get(i), approximate=approximate)
+            
+            # Prepare output according to contract
+            output = {
+                "id": question_id,
+                "final_answer": result["final_answer"],
+                "sql": result["sql"],
+                "confidence": result["confidence"],
+                "explanation": result["explanation"],
+                "citations": result["citations"]
+            }
+            
+            results.append(output)
+            print(f"   ✅ Completed: {question_id}")
+            
+        except Exception as e:
+            print(f"   ❌ Error processing question: {e}")
+            # Add error result
+            results.append({
+                "id": question_id,
+                "final_answer": f"Error: {str(e)}",
+                "sql": "",
+                "confidence": 0.0,
+                "explanation": "Processing failed",
+                "citations": []
+            })
     
     # Write results to output file
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -70,13 +108,17 @@ def process_batch_questions(input_file: str, output_file: str):
     print(f"   Input: {input_file}")
     print(f"   Output: {output_file}")
     print(f"   Processed: {len(results)} questions")
+    if agent.scheduler:
+        agent.scheduler.print_metrics()
 
-def process_single_question(question: str):
+def process_single_question(question: str, in_memory: bool = False, approximate: bool = False,
+                            schedule: bool = False, shard_dir: str = None):
     """Process a single question interactively"""
     print(f" Processing: {question}")
     
-    agent = SimpleHybridAgent()
-    result = agent.run(question)
+    sql_tool = SQLiteTool(in_memory=in_memory, shard_dir=shard_dir)
+    agent = SimpleHybridAgent(sql_tool, SQLScheduler(sql_tool) if schedule else None)
+    result = agent.run(question, approximate=approximate)
     
     print(f"\n Result:")
     print(f"Question: {result['question']}")
@@ -93,15 +135,29 @@ def main():
     parser.add_argument('--batch', type=str, help='Input JSONL file with questions')
     parser.add_argument('--out', type=str, help='Output JSONL file for results')
     parser.add_argument('--question', type=str, help='Single question to process')
+    parser.add_argument('--workers', type=int, default=0, help='Run batch SQL in this many worker processes')
+    parser.add_argument('--snapshot-dir', type=str, help='Copy the database here (e.g. /dev/shm) for the SQL workers')
+    parser.add_argument('--in-memory', action='store_true', help='Serve queries from an in-memory copy of the database')
+    parser.add_argument('--approximate', action='store_true', help='Answer supported KPIs from stratified samples')
+    parser.add_argument('--schedule', action='store_true', help='Route SQL through cost-based fast/slow lanes')
+    parser.add_argument('--shard-dir', type=str, help='Read date-bounded queries from shards built by build_shards.py')
+    parser.add_argument('--no-share-scans', action='store_true', help='Run each batch query on its own instead of sharing scans')
     
     args = parser.parse_args()
     
+    if args.snapshot_dir and not args.workers:
+        parser.error("--snapshot-dir is only used by the SQL workers; add --workers N")
+    
     if args.batch and args.out:
         # Batch processing mode
-        process_batch_questions(args.batch, args.out)
+        process_batch_questions(args.batch, args.out, share_scans=not args.no_share_scans,
+                                workers=args.workers, snapshot_dir=args.snapshot_dir,
+                                in_memory=args.in_memory, approximate=args.approximate,
+                                schedule=args.schedule, shard_dir=args.shard_dir)
     elif args.question:
         # Single question mode
-        process_single_question(args.question)
+        process_single_question(args.question, in_memory=args.in_memory, approximate=args.approximate,
+                                schedule=args.schedule, shard_dir=args.shard_dir)
     else:
         # Interactive mode
         print(" Retail Analytics Copilot")